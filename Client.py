@@ -2,9 +2,14 @@ import socket
 import time
 import struct
 import random
-from datetime import datetime
 import argparse
 import sys
+import ctypes
+import logging
+import array
+import errno
+import zlib
+import os
 
 # ==========================================
 # Configuration & Constants
@@ -15,91 +20,245 @@ DEVICE_ID = 1001
 REPORTING_INTERVAL = 1.0  # Seconds
 HEARTBEAT_INTERVAL = 5.0  # Seconds
 MAX_PAYLOAD_SIZE = 200    # Bytes
+MAX_DATAGRAM_SIZE = 1472  # Bytes (1500 MTU - 20 IPv4 - 8 UDP), --concat-datagrams limit
+CONCAT_MAX_DELAY = 0.5    # Seconds a concatenated datagram may wait before it is sent
+SEND_BUFFER_SIZE = 4 << 20  # SO_SNDBUF (4 MB)
+IP_TOS_LOW_DELAY = 0xB8   # DSCP EF (Expedited Forwarding)
+SO_NO_CHECK = 11          # Linux socket option (not exported by every Python build)
+MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0x40)
+SEND_RETRY_DELAY = 0.01   # Seconds to back off when the send buffer is full
+MIN_SLEEP = 0.001         # Seconds; floor of the loop's sleep so --interval 0 cannot spin a core
+SENDMMSG_MAX = 64         # Messages per sendmmsg(2) call
 BATCH_SIZE = 5            # Readings per packet
 
 # Protocol Definition
 # Header: DeviceID(2) + SeqNum(2) + Timestamp(4) + MsgType(1) = 9 Bytes
 HEADER_FORMAT = '!HHIB'  
+_HDR = struct.Struct(HEADER_FORMAT)
+_CHK = struct.Struct('!H')
+_COUNT = struct.Struct('!B')
+HEADER_SIZE = _HDR.size
+READING_FIELDS = 3  # Temperature, Humidity, Voltage (int16 each)
 MSG_INIT = 0x00
 MSG_DATA = 0x01
 MSG_HEARTBEAT = 0x02
-PROTOCOL_VERSION = 1  # We are defining this as Version 1
+PROTOCOL_VERSION = 2  # Version 2: int16 fixed-point readings (Version 1 sent float32)
+HEARTBEAT_META = (PROTOCOL_VERSION << 4) | MSG_HEARTBEAT
+
+# Fixed-point scales for the int16 readings (value = raw / scale)
+TEMP_SCALE = 100   # 0.01 °C  -> 15-35 °C  = 1500-3500
+HUM_SCALE = 100    # 0.01 %   -> 30-80 %   = 3000-8000
+VOLT_SCALE = 1000  # 0.001 V  -> 3.3-4.2 V = 3300-4200
+
+# Longest input whose byte sum (<= 255 * 256) cannot wrap the Adler-32 modulus
+ADLER_SAFE_LEN = 256
 
 # Dec 1, 2025 at 00:00:00 UTC (The Common Epoch)
 TIMESTAMP_OFFSET = 1764547200
 
-# Global state for smooth sensor simulation
-sim_state = {'temp': 25.0, 'hum': 50.0, 'volt': 3.7}
+# Per-packet log lines (lazy %-formatting, skipped entirely with --quiet)
+log = logging.getLogger('client')
+
+# Dedicated RNG for the sensor simulation (seeded in main)
+_RNG = random.Random()
 
-def get_current_time_ms():
+# Global state for smooth sensor simulation (plain floats, no dict lookups)
+sim_temp = 25.0
+sim_hum = 50.0
+sim_volt = 3.7
+
+def get_current_time_ms(now):
     """
-    Returns current time in milliseconds relative to TIMESTAMP_OFFSET.
+    Returns `now` (a time.time() value) in milliseconds relative to TIMESTAMP_OFFSET.
     """
-    current_time = time.time()
     # Subtract the offset to get "time since 2024"
-    relative_time = current_time - TIMESTAMP_OFFSET
+    relative_time = now - TIMESTAMP_OFFSET
     return int(relative_time * 1000) & 0xFFFFFFFF
 
 def compute_checksum(data: bytes) -> int:
-    """Compute 16-bit checksum."""
+    """
+    Compute 16-bit checksum (sum of all bytes, truncated to 16 bits).
+    While the byte sum stays below the Adler-32 modulus (65521), the low half
+    of zlib.adler32() is exactly 1 + sum(data), computed in C.
+    """
+    if len(data) <= ADLER_SAFE_LEN:
+        return ((zlib.adler32(data) & 0xFFFF) - 1) & 0xFFFF
     return sum(data) & 0xFFFF
 
 def generate_sensor_readings():
     """
     Simulates a sensor that 'drifts' slowly rather than jumping randomly.
+    Returns a (temperature, humidity, voltage) tuple.
     """
-    global sim_state
+    global sim_temp, sim_hum, sim_volt
     
-    # Drift the values slightly
-    sim_state['temp'] += random.uniform(-0.5, 0.5)
-    sim_state['hum']  += random.uniform(-1.0, 1.0)
-    sim_state['volt'] += random.uniform(-0.05, 0.05)
-    
-    # Clamp values to realistic ranges
-    sim_state['temp'] = max(15.0, min(35.0, sim_state['temp']))
-    sim_state['hum']  = max(30.0, min(80.0, sim_state['hum']))
-    sim_state['volt'] = max(3.3, min(4.2, sim_state['volt']))
+    uniform = _RNG.uniform
+
+    # Drift the values slightly, then clamp them to realistic ranges
+    sim_temp = max(15.0, min(35.0, sim_temp + uniform(-0.5, 0.5)))
+    sim_hum  = max(30.0, min(80.0, sim_hum + uniform(-1.0, 1.0)))
+    sim_volt = max(3.3, min(4.2, sim_volt + uniform(-0.05, 0.05)))
     
-    return {
-        'temperature': round(sim_state['temp'], 2),
-        'humidity': round(sim_state['hum'], 2),
-        'voltage': round(sim_state['volt'], 2)
-    }
+    # Raw floats: quantize_reading() fixes the wire precision, display code formats
+    return (sim_temp, sim_hum, sim_volt)
 
-def create_packet(device_id, seq_num, msg_type, payload_data=b''):
+def create_packet(device_id, seq_num, msg_type, payload_data=b'', now=None):
     """
     Generic function to create a packet with Header + Checksum + Payload.
+    Pass `now` to reuse the caller's loop timestamp instead of reading the clock again.
     """
     # 1. Prepare Header Fields
-    timestamp = get_current_time_ms()
+    if now is None:
+        now = time.time()
+    timestamp = get_current_time_ms(now)
 
     # Logic: Shift Version left by 4 bits, then OR it with the Message Type
     msg_version_byte = (PROTOCOL_VERSION << 4) | (msg_type & 0x0F)
     
-    # 2. Pack Header (9 Bytes)
-    header = struct.pack(HEADER_FORMAT, device_id, seq_num, timestamp, msg_version_byte)
+    # 2. Pack Header (9 Bytes) and Payload in place (one allocation per packet)
+    packet = bytearray(HEADER_SIZE + 2 + len(payload_data))
+    _HDR.pack_into(packet, 0, device_id, seq_num, timestamp, msg_version_byte)
+    packet[HEADER_SIZE + 2:] = payload_data
     
     # 3. Compute Checksum (Header + Payload)
-    checksum = compute_checksum(header + payload_data)
-    checksum_bytes = struct.pack('!H', checksum) # 2 Bytes
+    # The checksum field is still zero here, so summing the whole buffer is the same
+    checksum = compute_checksum(packet)
+    _CHK.pack_into(packet, HEADER_SIZE, checksum) # 2 Bytes
     
-    # 4. Assemble Final Packet
-    return header + checksum_bytes + payload_data
+    return packet
 
-def prepare_batch_payload(readings_list):
+def patch_heartbeat(template, device_id, seq_num, now):
     """
-    Packs a list of readings into a binary payload.
-    Format: [Count: 1B] + [Reading1: 12B] + [Reading2: 12B] ...
+    Refreshes a prebuilt heartbeat packet in place. A heartbeat has no payload,
+    so only SeqNum, Timestamp and the checksum change between sends.
     """
-    # Pack count
-    count = len(readings_list)
-    payload = struct.pack('!B', count)
-    
-    # Pack readings
-    for r in readings_list:
-        payload += struct.pack('!fff', r['temperature'], r['humidity'], r['voltage'])
-        
-    return payload
+    _HDR.pack_into(template, 0, device_id, seq_num, get_current_time_ms(now), HEARTBEAT_META)
+    _CHK.pack_into(template, HEADER_SIZE, compute_checksum(memoryview(template)[:HEADER_SIZE]))
+
+def quantize_reading(reading):
+    """
+    Converts a (temperature, humidity, voltage) tuple to int16 fixed-point.
+    """
+    t, h, v = reading
+    return (round(t * TEMP_SCALE), round(h * HUM_SCALE), round(v * VOLT_SCALE))
+
+def prepare_batch_payload(readings):
+    """
+    Packs a flat int16 array of quantized readings (temperature, humidity,
+    voltage, ...) into a binary payload.
+    Format: [Count: 1B] + [Reading1: 6B] + [Reading2: 6B] ...
+    """
+    count = len(readings) // READING_FIELDS
+
+    # Whole batch goes out with one buffer copy; swap to network order if needed
+    wire = array.array('h', readings)
+    if sys.byteorder == 'little':
+        wire.byteswap()
+
+    return _COUNT.pack(count) + wire.tobytes()
+
+# ==========================================
+# Batched Send (Linux sendmmsg)
+# ==========================================
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr), ('msg_len', ctypes.c_uint)]
+
+try:
+    _libc = ctypes.CDLL("libc.so.6", use_errno=True) if sys.platform.startswith('linux') else None
+    _sendmmsg = _libc.sendmmsg if _libc is not None else None
+except (OSError, AttributeError):
+    _sendmmsg = None
+
+# Message headers are built once and reused by every send_batch call; each
+# slot points at its own iovec, only iov_base/iov_len change per packet.
+# msg_name stays NULL: the destination comes from connect().
+_IOVECS = (_IOVec * SENDMMSG_MAX)()
+_MSGS = (_MMsgHdr * SENDMMSG_MAX)()
+for _i in range(SENDMMSG_MAX):
+    _MSGS[_i].msg_hdr.msg_iov = ctypes.pointer(_IOVECS[_i])
+    _MSGS[_i].msg_hdr.msg_iovlen = 1
+
+def queue_packet(pending, packet, concat):
+    """
+    Queues a packet for the next send_batch flush. With concat enabled the
+    packet is appended to the last queued datagram while it fits in
+    MAX_DATAGRAM_SIZE (the server splits them again by header).
+    """
+    if concat and pending and len(pending[-1]) + len(packet) <= MAX_DATAGRAM_SIZE:
+        pending[-1] += packet
+    else:
+        pending.append(packet)
+
+def send_packet(sock, packet):
+    """
+    Sends one packet on the connected socket.
+    A connected UDP socket reports an earlier ICMP port-unreachable (server not
+    up yet) as ConnectionRefusedError on the next send without transmitting it,
+    so retry once to keep the old fire-and-forget sendto() behaviour.
+    Returns False if the (non-blocking) socket's send buffer is full.
+    """
+    try:
+        try:
+            sock.send(packet)
+        except ConnectionRefusedError:
+            sock.send(packet)
+    except BlockingIOError:
+        return False
+    return True
+
+def send_batch(sock, packets):
+    """
+    Sends all queued packets (bytearrays from create_packet) on the connected
+    socket, using a single sendmmsg(2) call on Linux.
+    Falls back to one send() per packet elsewhere (and for a single packet).
+    Returns how many packets were sent; the rest did not fit in the send buffer.
+    """
+    if _sendmmsg is None or len(packets) == 1:
+        for i, packet in enumerate(packets):
+            if not send_packet(sock, packet):
+                return i
+        return len(packets)
+
+    fd = sock.fileno()
+    total_sent = 0
+    for start in range(0, len(packets), SENDMMSG_MAX):
+        chunk = packets[start:start + SENDMMSG_MAX]
+        count = len(chunk)
+        views = []  # Keeps the packet buffers exported until the call returns
+        for i, packet in enumerate(chunk):
+            view = (ctypes.c_char * len(packet)).from_buffer(packet)
+            views.append(view)
+            _IOVECS[i].iov_base = ctypes.addressof(view)
+            _IOVECS[i].iov_len = len(packet)
+
+        # sendmmsg may return early; resend from the first unsent message
+        sent = 0
+        refused = False
+        while sent < count:
+            n = _sendmmsg(fd, ctypes.byref(_MSGS, sent * ctypes.sizeof(_MMsgHdr)), count - sent, MSG_DONTWAIT)
+            if n < 0:
+                err = ctypes.get_errno()
+                if err == errno.ECONNREFUSED and not refused:
+                    refused = True  # Stale ICMP error, see send_packet()
+                    continue
+                if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break  # Send buffer full; caller keeps the rest queued
+                raise OSError(err, os.strerror(err))
+            sent += n
+
+        total_sent += sent
+        if sent < count:
+            break
+    return total_sent
 
 def main():
     # 1. Argument Parsing
@@ -111,35 +270,64 @@ def main():
     parser.add_argument('--batch', type=int, default=1, help='Batch size (1 to N)') 
     parser.add_argument('--seed', type=int, default=None, help='Deterministic seed for RNG')
     parser.add_argument('--heartbeat', type=float, default=HEARTBEAT_INTERVAL, help='heartbeat interval (s)')
+    parser.add_argument('--concat-datagrams', action='store_true', help='Pack several packets into one UDP datagram')
+    parser.add_argument('--quiet', action='store_true', help='Suppress per-packet log lines')
 
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(message)s', stream=sys.stdout)
+
     # --- SEEDING LOGIC ---
     if args.seed is not None:
-        random.seed(args.seed)
+        _RNG.seed(args.seed)
         print(f"[*] Mode: DETERMINISTIC (Seed: {args.seed})")
     else:
         seed_val = int(time.time() * 1000) % 1000000
-        random.seed(seed_val)
+        _RNG.seed(seed_val)
         print(f"[*] Mode: RANDOM (Seed: {seed_val})")
     # ---------------------
 
     # Apply configuration
     device_id = args.id
-    server_addr = (args.host, args.port)
+    # Resolve the host once up front; connect() then gets a numeric address
+    server_addr = socket.getaddrinfo(args.host, args.port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
     reporting_interval = args.interval
-    batch_limit = args.batch
+    batch_limit = max(1, args.batch)  # At least one reading per packet (sizes the readings buffer)
     heart_beat_interval = args.heartbeat
+    concat = args.concat_datagrams
 
     # 2. Setup UDP Socket
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # Single fixed destination: connect once and use send() instead of sendto()
+    sock.connect(server_addr)
+    # Room for bursts of batched/concatenated datagrams without send-side drops
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE)
+    if sys.platform.startswith('linux'):
+        # Skip the kernel UDP checksum; every packet already carries our own 16-bit checksum
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, getattr(socket, 'SO_NO_CHECK', SO_NO_CHECK), 1)
+        except OSError:
+            pass
+    # Mark telemetry as low-latency traffic (best effort, routers may ignore it)
+    try:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, IP_TOS_LOW_DELAY)
+    except (OSError, AttributeError):
+        pass
+    # Never stall the timers on a full send buffer; unsent packets stay queued
+    sock.setblocking(False)
     
     print(f"[*] Sensor {device_id} started.")
     print(f"[*] Target: {server_addr}")
     print(f"[*] Interval: {reporting_interval}s | Batch Size: {batch_limit}")
 
     seq_num = 1
-    readings_buffer = []
+    # Flat int16 readings of the current batch, allocated once and refilled in place
+    readings_buffer = array.array('h', [0]) * (READING_FIELDS * batch_limit)
+    buffered = 0  # Slots of readings_buffer filled so far
+    hb_template = bytearray(HEADER_SIZE + 2)  # Patched in place for every heartbeat
+    pending = []  # Datagrams waiting for the next send_batch flush
+    pending_since = 0.0  # When the oldest queued datagram was started (concat mode)
 
     # Independent Timers
     last_read_time = time.time()
@@ -147,27 +335,43 @@ def main():
 
     # Send INIT packet
     init_packet = create_packet(device_id, seq_num, MSG_INIT)
-    sock.sendto(init_packet, server_addr)
+    send_packet(sock, init_packet)
     print(f"[INIT] Seq:{seq_num} | Device {device_id} initialized")
     seq_num = (seq_num + 1) % 65536
 
+    # Hot-loop callables bound to locals (LOAD_FAST instead of global/attribute lookups)
+    _time = time.time
+    _sleep = time.sleep
+    _read_sensor = generate_sensor_readings
+    _quantize = quantize_reading
+    _prepare_batch = prepare_batch_payload
+    _create_packet = create_packet
+    _patch_heartbeat = patch_heartbeat
+    _queue_packet = queue_packet
+    _send_batch = send_batch
+    _log_info = log.info
+
     try:
         while True:
-            current_time = time.time()
+            current_time = _time()
 
             # --- Logic 1: Generate Data ---
             if (current_time - last_read_time >= reporting_interval):
                 
                 # 1. Read Sensor
-                reading = generate_sensor_readings()
-                readings_buffer.append(reading)
+                reading = _read_sensor()
+                t_raw, h_raw, v_raw = _quantize(reading)
+                readings_buffer[buffered] = t_raw
+                readings_buffer[buffered + 1] = h_raw
+                readings_buffer[buffered + 2] = v_raw
+                buffered += READING_FIELDS
                 last_read_time = current_time 
                 
                 # 2. Check if ready to send (Batch full?)
-                if len(readings_buffer) >= batch_limit:
+                if buffered >= len(readings_buffer):
                     
                     # Prepare & Send
-                    payload = prepare_batch_payload(readings_buffer)
+                    payload = _prepare_batch(readings_buffer)
                     
                     # Safety Check
                     if len(payload) > MAX_PAYLOAD_SIZE:
@@ -179,15 +383,17 @@ def main():
                     #     print(f"\n[!!!] FATAL ERROR: Payload size ({len(packet)}B) exceeds limit.")
                     #     break
 
-                    packet = create_packet(device_id, seq_num, MSG_DATA, payload)
-                    sock.sendto(packet, server_addr)
+                    packet = _create_packet(device_id, seq_num, MSG_DATA, payload, now=current_time)
+                    if not pending:
+                        pending_since = current_time
+                    _queue_packet(pending, packet, concat)
                     
-                    print(f"[DATA] Seq:{seq_num} | Time:{current_time:.2f} | Size:{len(packet)}B")
+                    _log_info("[DATA] Seq:%d | Time:%.2f | Size:%dB", seq_num, current_time, len(packet))
                     
                     # Update Network Timer
                     last_send_time = current_time 
                     
-                    readings_buffer = []
+                    buffered = 0
                     seq_num = (seq_num + 1) % 65536
             
             # --- Logic 2: Heartbeat ---
@@ -195,20 +401,41 @@ def main():
             time_since_send = current_time - last_send_time
             
             # Send heartbeat ONLY if buffer empty and timer expired
-            if (len(readings_buffer) == 0) and (time_since_send > heart_beat_interval):
+            if (buffered == 0) and (time_since_send > heart_beat_interval):
                 
-                packet = create_packet(device_id, seq_num, MSG_HEARTBEAT)
-                sock.sendto(packet, server_addr)
-                print(f"[HEARTBEAT] Seq:{seq_num} | Alive")
+                _patch_heartbeat(hb_template, device_id, seq_num, current_time)
+                packet = bytearray(hb_template)  # Queued copy; the template is reused
+                if not pending:
+                    pending_since = current_time
+                _queue_packet(pending, packet, concat)
+                _log_info("[HEARTBEAT] Seq:%d | Alive", seq_num)
                 
                 # Update Network Timer
                 last_send_time = current_time
                 seq_num = (seq_num + 1) % 65536
 
-            time.sleep(0.01)
+            # --- Flush queued packets before sleeping ---
+            # (concat mode holds them until a datagram is full or CONCAT_MAX_DELAY passes)
+            blocked = False
+            if pending and (not concat or len(pending) > 1 or current_time - pending_since >= CONCAT_MAX_DELAY):
+                sent = _send_batch(sock, pending)
+                del pending[:sent]
+                blocked = len(pending) > 0
+
+            # --- Sleep until the next timer is due (instead of polling) ---
+            next_deadline = last_read_time + reporting_interval
+            if buffered == 0:
+                next_deadline = min(next_deadline, last_send_time + heart_beat_interval)
+            if blocked:
+                next_deadline = min(next_deadline, current_time + SEND_RETRY_DELAY)
+            elif pending:
+                next_deadline = min(next_deadline, pending_since + CONCAT_MAX_DELAY)
+            _sleep(max(MIN_SLEEP, next_deadline - current_time))
 
     except KeyboardInterrupt:
         print("\n[!] Sensor shutting down.")
+        if pending:
+            send_batch(sock, pending)
         sock.close()
     except Exception as e:
         print(f"\n[!] Error: {e}")
@@ -9,14 +9,17 @@ ROOT_DIR="Output"
 DURATION=120  # Required 120s test per scenario
 SERVER_PORT=12000
 
+# PIDs of the processes started by this script
+PIDS=()
+
 # ----------- Cleanup Function -----------
 cleanup() {
     # Remove network impairments
     sudo tc qdisc del dev $INTERFACE root 2>/dev/null
-    # Kill background python processes
-    pkill -f "python3 Server.py"
-    pkill -f "python3 Client.py"
-    sleep 1
+    # Stop only the processes we started and wait for them to exit
+    for pid in "${PIDS[@]}"; do kill $pid 2>/dev/null; done
+    for pid in "${PIDS[@]}"; do wait $pid 2>/dev/null; done
+    PIDS=()
 }
 
 # ----------- Test Execution Function -----------
@@ -43,36 +46,46 @@ run_test() {
     fi
 
     # Start Server (CSV output directed to scenario folder)
+    rm -f "$CSV_FILE"
     python3 Server.py --port $SERVER_PORT --output $CSV_FILE &
     SERVER_PID=$!
-    sleep 2
+    PIDS+=($SERVER_PID)
+    # The server creates its CSV right after binding: poll for it (up to 2s)
+    for (( t=0; t<40; t++ )); do [ -f "$CSV_FILE" ] && break; sleep 0.05; done
 
     # Start Client(s)
     CLIENT_PIDS=()
     for (( i=0; i<CLIENTS; i++ )); do
         ID=$((101 + i))
-        python3 Client.py --id $ID --host "localhost" --port $SERVER_PORT --interval $INTERVAL --batch $BATCH > /dev/null 2>&1 &
+        python3 Client.py --id $ID --host "localhost" --port $SERVER_PORT --interval $INTERVAL --batch $BATCH --quiet > /dev/null 2>&1 &
         CLIENT_PIDS+=($!)
+        PIDS+=($!)
         sleep 0.1
     done
 
     # Run for the specified duration
     sleep $DURATION
 
-    # Graceful Shutdown
-    for pid in "${CLIENT_PIDS[@]}"; do kill -INT $pid 2>/dev/null; done
-    sleep 1
+    # Graceful Shutdown (background jobs ignore SIGINT, so clients get SIGTERM)
+    for pid in "${CLIENT_PIDS[@]}"; do kill $pid 2>/dev/null; done
+    for pid in "${CLIENT_PIDS[@]}"; do wait $pid 2>/dev/null; done
     kill -INT $SERVER_PID 2>/dev/null
-    sleep 2
     
-    # Force kill if still hanging
-    kill -9 $SERVER_PID 2>/dev/null
+    # Force kill if still hanging after 2s; otherwise return as soon as it has flushed and exited
+    ( sleep 2; kill -9 $SERVER_PID 2>/dev/null ) &
+    WATCHDOG_PID=$!
+    wait $SERVER_PID 2>/dev/null
+    kill $WATCHDOG_PID 2>/dev/null
+    # Clients and server are reaped; drop their PIDs so cleanup() never signals a reused PID
+    PIDS=()
     sudo tc qdisc del dev $INTERFACE root 2>/dev/null
 }
 
 # ----------- Main Execution -----------
 mkdir -p "$ROOT_DIR"
+# Background jobs ignore SIGINT: stop them ourselves on Ctrl-C, kill or normal exit
 trap cleanup EXIT
+trap 'exit 130' INT TERM
 
 echo "[*] Starting Data Collection..."
 
@@ -100,7 +113,7 @@ echo "[*] All data generated in '$ROOT_DIR' folder."
 # This is the line to add:
 python3 plot_results.py
 
-echo "[*] Graphs have been generated in the 'Graphs' folder."
+echo "[*] Summary graph generated at 'Graphs/summary.png'."
 
 cleanup
 echo "[*] Done."
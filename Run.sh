@@ -9,13 +9,16 @@ ROOT_DIR="Output"
 DURATION=60
 SERVER_PORT=12000
 
+# PIDs of the processes started by this script
+PIDS=()
+
 # ----------- Common Cleanup Function -----------
 cleanup() {
     tc qdisc del dev $INTERFACE root 2>/dev/null
-    pkill -f "python3 Server.py"
-    pkill -f "python3 Client.py"
-    pkill -f "tcpdump"
-    sleep 1
+    # Stop only the processes we started and wait for them to exit
+    for pid in "${PIDS[@]}"; do kill $pid 2>/dev/null; done
+    for pid in "${PIDS[@]}"; do wait $pid 2>/dev/null; done
+    PIDS=()
 }
 
 # ----------- Core Test Function -----------
@@ -46,30 +49,42 @@ run_test() {
 
     # --- Always Record PCAP ---
     tcpdump -i $INTERFACE udp port $SERVER_PORT -w $PCAP_FILE -q > /dev/null 2>&1 &
+    TCPDUMP_PID=$!
+    PIDS+=($TCPDUMP_PID)
     sleep 1
     # --------------------------
 
+    rm -f "$CSV_FILE"
     python3 Server.py --port $SERVER_PORT --output $CSV_FILE &
     SERVER_PID=$!
-    sleep 1
+    PIDS+=($SERVER_PID)
+    # The server creates its CSV right after binding: poll for it (up to 1s)
+    for (( t=0; t<20; t++ )); do [ -f "$CSV_FILE" ] && break; sleep 0.05; done
 
     CLIENT_PIDS=()
     for (( i=0; i<CLIENTS; i++ )); do
         ID=$((101 + i))
-        python3 Client.py --id $ID --host "localhost" --port $SERVER_PORT --interval $INTERVAL --batch $BATCH $EXTRA_ARGS > /dev/null 2>&1 &
+        python3 Client.py --id $ID --host "localhost" --port $SERVER_PORT --interval $INTERVAL --batch $BATCH --quiet $EXTRA_ARGS > /dev/null 2>&1 &
         CLIENT_PIDS+=($!)
+        PIDS+=($!)
         sleep 0.1
     done
 
     sleep $DURATION
     echo ""
 
-    for pid in "${CLIENT_PIDS[@]}"; do kill -INT $pid; done
-    sleep 1
+    # Background jobs ignore SIGINT, so clients get SIGTERM
+    for pid in "${CLIENT_PIDS[@]}"; do kill $pid; done
+    for pid in "${CLIENT_PIDS[@]}"; do wait $pid 2>/dev/null; done
 
     kill -INT $SERVER_PID
-    sleep 3
-    kill -9 $SERVER_PID 2>/dev/null
+    # Force kill if still hanging after 3s; otherwise return as soon as it has flushed and exited
+    ( sleep 3; kill -9 $SERVER_PID 2>/dev/null ) &
+    WATCHDOG_PID=$!
+    wait $SERVER_PID 2>/dev/null
+    kill $WATCHDOG_PID 2>/dev/null
+    # Clients and server are reaped; only tcpdump is left for cleanup()
+    PIDS=($TCPDUMP_PID)
     
     tc qdisc del dev $INTERFACE root 2>/dev/null
     
@@ -78,6 +93,9 @@ run_test() {
 
 # ----------- Create Root Directory -----------
 mkdir -p "$ROOT_DIR"
+# Background jobs ignore SIGINT: stop them ourselves on Ctrl-C, kill or normal exit
+trap cleanup EXIT
+trap 'exit 130' INT TERM
 
 # ----------- Run Tests -----------
 
@@ -1,13 +1,21 @@
 import socket
-import csv
 import struct
 import argparse
 import time
 from collections import deque
-from datetime import datetime
-from time import process_time 
 from time import perf_counter
 import signal  # <--- ADD THIS
+import zlib
+import heapq
+import itertools
+import threading
+import queue
+import logging
+import ctypes
+import select
+import errno
+import sys
+import os
 
 
 
@@ -16,9 +24,22 @@ import signal  # <--- ADD THIS
 # ==========================================
 HEADER_FORMAT = '!HHIB'  # DeviceID(2), SeqNum(2), Timestamp(4), MsgType(1)
 HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# Precompiled formats for the receive path
+_HDR_CHK = struct.Struct(HEADER_FORMAT + 'H')  # Header + Checksum in one call
+_READING_V1 = struct.Struct('!fff')  # float32 readings (12 Bytes)
+_READING_V2 = struct.Struct('!hhh')  # int16 fixed-point readings (6 Bytes)
+_READINGS_STRUCTS = {}  # (reading format, count) -> Struct for a whole payload
 SEQ_MAX = 65536          
 WRAP_THRESHOLD = 30000   
-VERSION = 1
+DUP_WINDOW = 500         # Recent sequence numbers checked for duplicates
+ENTRY_POOL_SIZE = 256    # Recycled PacketEntry objects kept per device
+VERSION = 2
+# Version 2 readings are int16 fixed-point (value = raw / scale); Version 1 sent float32
+TEMP_SCALE = 100
+HUM_SCALE = 100
+VOLT_SCALE = 1000
+# Longest input whose byte sum (<= 255 * 256) cannot wrap the Adler-32 modulus
+ADLER_SAFE_LEN = 256
 # Reordering Settings
 DEFAULT_FLUSH_THRESHOLD = 20      
 
@@ -26,21 +47,224 @@ DEFAULT_FLUSH_THRESHOLD = 20
 MSG_INIT = 0x00
 MSG_DATA = 0x01
 MSG_HEARTBEAT = 0x02
+# CSV msg_type column; any other type value is logged as HEARTBEAT, as before
+_MSG_TYPE_NAME = {MSG_INIT: 'INIT', MSG_DATA: 'DATA', MSG_HEARTBEAT: 'HEARTBEAT'}
 
 # Dec 1, 2025 at 00:00:00 UTC (The Common Epoch)
 TIMESTAMP_OFFSET = 1764547200
 
 LIVENESS_TIMEOUT = 10.0  
 SOCKET_TIMEOUT = 1.0    
+RECV_BUFFER_SIZE = 2048  # Room for a full concatenated datagram (<= 1472 B)
+CSV_BUFFER_SIZE = 1 << 16  # Write buffer for the session CSV
+RECV_SOCKET_BUFFER = 8 << 20  # SO_RCVBUF (8 MB): absorbs bursts while the CSV is written
+CSV_FLUSH_EVERY = 64     # Rows collected before one write() call
+CSV_LINE_END = '\r\n'    # Same terminator csv.writer used
+RECVMMSG_MAX = 32        # Datagrams drained per recvmmsg() call
+MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0x40)
+_SOCKADDR_IN = struct.Struct('!2xH4s')  # sin_family (skipped), sin_port, sin_addr
+SOCKADDR_IN_SIZE = 16
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35)  # Linux; also the cmsg type
+_CMSG_HDR = struct.Struct('@Nii')   # cmsg_len, cmsg_level, cmsg_type
+_TIMESPEC = struct.Struct('@qq')    # tv_sec, tv_nsec
+CMSG_TS_SPACE = _CMSG_HDR.size + _TIMESPEC.size  # One timestamp cmsg (already aligned)
 SOURCE_PORT = 12000
 OUTPUT_CSV = 'telemetry_log.csv' 
 
+# Per-event log lines (lazy %-formatting; --quiet keeps only warnings)
+log = logging.getLogger('server')
+
+# ==========================================
+# Packet Entries
+# ==========================================
+class PacketEntry:
+    """
+    A parsed packet waiting in a device's reorder buffer (fixed slots, no per-entry dict).
+    Entries are recycled through each device's entry_pool once their rows are queued,
+    together with their readings list; reset() refills every field.
+    """
+    __slots__ = ('device_id', 'seq', 'timestamp_sent', 'arrival_time', 'latency', 'jitter',
+                 'duplicate', 'gap_detected', 'gap_count', 'msg_type', 'payload_len',
+                 'readings', 'status', 'parse_cost_ms', 'cpu_ms')
+
+    def __init__(self):
+        self.readings = []
+
+    def reset(self, device_id, seq, timestamp_sent, arrival_time, latency, jitter,
+              msg_type, payload_len, parse_cost_ms):
+        self.device_id = device_id
+        self.seq = seq
+        self.timestamp_sent = timestamp_sent
+        self.arrival_time = arrival_time
+        self.latency = latency
+        self.jitter = jitter
+        self.duplicate = False
+        self.gap_detected = False
+        self.gap_count = 0
+        self.msg_type = msg_type
+        self.payload_len = payload_len
+        self.status = 'Buffered'
+        self.parse_cost_ms = parse_cost_ms
+        self.cpu_ms = 0.0
+
 # ==========================================
 # Helper Functions
 # ==========================================
 def compute_checksum(data: bytes) -> int:
+    """
+    Compute 16-bit checksum (sum of all bytes, truncated to 16 bits).
+    While the byte sum stays below the Adler-32 modulus (65521), the low half
+    of zlib.adler32() is exactly 1 + sum(data), computed in C.
+    """
+    if len(data) <= ADLER_SAFE_LEN:
+        return ((zlib.adler32(data) & 0xFFFF) - 1) & 0xFFFF
     return sum(data) & 0xFFFF
 
+def readings_struct(reading_format, count):
+    """Returns a cached Struct that unpacks `count` readings in one call."""
+    key = (reading_format, count)
+    st = _READINGS_STRUCTS.get(key)
+    if st is None:
+        st = _READINGS_STRUCTS[key] = struct.Struct('!' + reading_format * count)
+    return st
+
+def split_datagram(data):
+    """
+    Yields the packets carried by one datagram. Clients running with
+    --concat-datagrams send several complete packets back to back; each
+    packet's length follows from its MsgType, Version and reading count.
+    Packets are yielded as memoryview slices, so splitting copies nothing.
+    """
+    data = memoryview(data)
+    offset = 0
+    total = len(data)
+    while offset < total:
+        end = total
+        if total - offset >= HEADER_SIZE + 3:
+            msg_version_byte = data[offset + HEADER_SIZE - 1]
+            if msg_version_byte & 0x0F == MSG_DATA:
+                reading_size = 6 if (msg_version_byte >> 4) >= 2 else 12
+                count = data[offset + HEADER_SIZE + 2]
+                end = min(total, offset + HEADER_SIZE + 3 + count * reading_size)
+            else:
+                end = offset + HEADER_SIZE + 2  # INIT / HEARTBEAT: header + checksum only
+        yield data[offset:end]
+        offset = end
+
+# ==========================================
+# Batched Receive (Linux recvmmsg)
+# ==========================================
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr), ('msg_len', ctypes.c_uint)]
+
+try:
+    _libc = ctypes.CDLL("libc.so.6", use_errno=True) if sys.platform.startswith('linux') else None
+    _recvmmsg = _libc.recvmmsg if _libc is not None else None
+except (OSError, AttributeError):
+    _recvmmsg = None
+
+# Receive slots are allocated once: each message header points at its own
+# iovec, datagram buffer, sockaddr_in buffer and control buffer (for the
+# SO_TIMESTAMPNS arrival time), reused by every recvmmsg call.
+_RECV_BUFS = [bytearray(RECV_BUFFER_SIZE) for _ in range(RECVMMSG_MAX)]
+_RECV_VIEWS = [memoryview(buf) for buf in _RECV_BUFS]
+_RECV_NAMES = [bytearray(SOCKADDR_IN_SIZE) for _ in range(RECVMMSG_MAX)]
+_RECV_CTRLS = [bytearray(CMSG_TS_SPACE) for _ in range(RECVMMSG_MAX)]
+_RECV_IOVECS = (_IOVec * RECVMMSG_MAX)()
+_RECV_MSGS = (_MMsgHdr * RECVMMSG_MAX)()
+for _i in range(RECVMMSG_MAX):
+    _RECV_IOVECS[_i].iov_base = ctypes.addressof((ctypes.c_char * RECV_BUFFER_SIZE).from_buffer(_RECV_BUFS[_i]))
+    _RECV_IOVECS[_i].iov_len = RECV_BUFFER_SIZE
+    _RECV_MSGS[_i].msg_hdr.msg_iov = ctypes.pointer(_RECV_IOVECS[_i])
+    _RECV_MSGS[_i].msg_hdr.msg_iovlen = 1
+    _RECV_MSGS[_i].msg_hdr.msg_name = ctypes.addressof((ctypes.c_char * SOCKADDR_IN_SIZE).from_buffer(_RECV_NAMES[_i]))
+    _RECV_MSGS[_i].msg_hdr.msg_namelen = SOCKADDR_IN_SIZE
+    _RECV_MSGS[_i].msg_hdr.msg_control = ctypes.addressof((ctypes.c_char * CMSG_TS_SPACE).from_buffer(_RECV_CTRLS[_i]))
+    _RECV_MSGS[_i].msg_hdr.msg_controllen = CMSG_TS_SPACE
+
+def setup_receive(sock):
+    """
+    Prepares the socket for receive_batch. With recvmmsg the socket is made
+    non-blocking and a poll object is returned for waiting; otherwise the
+    socket keeps a timeout and None is returned.
+    """
+    if _recvmmsg is None:
+        sock.settimeout(SOCKET_TIMEOUT)
+        return None
+    # Have the kernel stamp each datagram's arrival (delivered as a cmsg)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+    except OSError:
+        pass
+    sock.setblocking(False)
+    poller = select.poll()
+    poller.register(sock, select.POLLIN)
+    return poller
+
+def receive_batch(sock, poller):
+    """
+    Returns the (datagram, addr, arrival_time) tuples that arrived, or an
+    empty list if nothing came in within SOCKET_TIMEOUT. With recvmmsg the
+    arrival time is the kernel's SO_TIMESTAMPNS stamp, else time.time().
+    On Linux a single recvmmsg(2) call drains up to RECVMMSG_MAX datagrams into
+    the preallocated slots; the returned memoryviews are only valid until the
+    next call, so the caller processes them all first.
+    Falls back to one recvfrom_into() per call elsewhere, reusing the first slot.
+    """
+    if poller is None:
+        try:
+            nbytes, addr = sock.recvfrom_into(_RECV_BUFS[0])
+        except socket.timeout:
+            return []
+        return [(_RECV_VIEWS[0][:nbytes], addr, time.time())]
+
+    fd = sock.fileno()
+    n = _recvmmsg(fd, _RECV_MSGS, RECVMMSG_MAX, MSG_DONTWAIT, None)
+    if n < 0:
+        err = ctypes.get_errno()
+        if err not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+            raise OSError(err, os.strerror(err))
+        # Queue empty: sleep in poll() until data arrives or the timeout passes
+        if not poller.poll(SOCKET_TIMEOUT * 1000):
+            return []
+        n = _recvmmsg(fd, _RECV_MSGS, RECVMMSG_MAX, MSG_DONTWAIT, None)
+        if n < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, os.strerror(err))
+
+    batch = []
+    fallback_time = None
+    for i in range(n):
+        hdr = _RECV_MSGS[i]
+        port, ip = _SOCKADDR_IN.unpack_from(_RECV_NAMES[i])
+        arrival_time = None
+        if hdr.msg_hdr.msg_controllen >= CMSG_TS_SPACE:
+            _, level, cmsg_type = _CMSG_HDR.unpack_from(_RECV_CTRLS[i])
+            if level == socket.SOL_SOCKET and cmsg_type == SO_TIMESTAMPNS:
+                sec, nsec = _TIMESPEC.unpack_from(_RECV_CTRLS[i], _CMSG_HDR.size)
+                arrival_time = sec + nsec * 1e-9
+        if arrival_time is None:
+            # No kernel stamp (option unsupported): one clock read per batch
+            if fallback_time is None:
+                fallback_time = time.time()
+            arrival_time = fallback_time
+        batch.append((_RECV_VIEWS[i][:hdr.msg_len], (socket.inet_ntoa(ip), port), arrival_time))
+        # The kernel overwrites these lengths; re-arm the slot
+        hdr.msg_hdr.msg_namelen = SOCKADDR_IN_SIZE
+        hdr.msg_hdr.msg_controllen = CMSG_TS_SPACE
+    return batch
+
 def initialize_csv(filename):
     headers = [
         'device_id', 'seq', 'timestamp_raw', 'readable_time', 'arrival_time', 
@@ -48,44 +272,89 @@ def initialize_csv(filename):
         'latency_ms', 'jitter_ms', 'msg_type', 'payload_size', 
         'temp', 'humidity', 'voltage', 'cpu_ms'  # <--- Added sensor fields
     ]
-    with open(filename, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
+    # Kept open for the whole session; rows are preformatted strings
+    f = open(filename, 'w', newline='', buffering=CSV_BUFFER_SIZE)
+    f.write(','.join(headers) + CSV_LINE_END)
+    # Header reaches disk now: even a server killed before its first flush leaves a readable CSV
+    f.flush()
     print(f"[*] Log file initialized: {filename}")
-
-def log_packet(filename, data_dict, t, h, v): # Added t, h, v parameters
-    dt_object = datetime.fromtimestamp(data_dict['arrival_time'])
-    readable_str = dt_object.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-
-    server_relative_time = data_dict['arrival_time'] - TIMESTAMP_OFFSET
+    return f
+
+# Rows waiting for the next flush_rows() call
+_PENDING_ROWS = []
+# Row batches for the CSV writer thread; _FLUSH_FILE asks it to flush, None stops it
+_CSV_QUEUE = queue.SimpleQueue()
+_FLUSH_FILE = object()
+# [second, formatted date/time] of the last arrival, formatted once per second
+_TS_CACHE = [None, '']
+
+def log_packet(entry):
+    """
+    Queues one CSV row per reading (a single zero row for INIT/HEARTBEAT).
+    Everything but the reading columns is formatted once per packet.
+    """
+    # Same text as datetime.fromtimestamp(...).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    sec = int(entry.arrival_time)
+    usec = round((entry.arrival_time - sec) * 1e6)
+    if usec >= 1000000:
+        sec += 1
+        usec -= 1000000
+    if sec != _TS_CACHE[0]:
+        _TS_CACHE[0] = sec
+        _TS_CACHE[1] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))
+    readable_str = f"{_TS_CACHE[1]}.{usec // 1000:03d}"
+
+    server_relative_time = entry.arrival_time - TIMESTAMP_OFFSET
     server_arrival_ms = int(server_relative_time * 1000) & 0xFFFFFFFF
 
-    with open(filename, 'a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            data_dict['device_id'],
-            data_dict['seq'],
-            data_dict['timestamp_sent'], 
-            readable_str,
-            server_arrival_ms,
-            int(data_dict['duplicate']),
-            int(data_dict['gap_detected']),
-            data_dict['gap_count'],
-            f"{data_dict['latency']:.3f}",
-            f"{data_dict['jitter']:.3f}",
-            data_dict['msg_type'],
-            data_dict['payload_len'],
-            round(t, 2),  # Individual reading
-            round(h, 2),  # Individual reading
-            round(v, 2),  # Individual reading
-            f"{data_dict.get('cpu_ms', 0):.6f}"
-        ])
-
-
-def process_and_log_packet(state, packet_data, filename):
+    # Every field is a number or a fixed token (no commas/quotes), so rows are
+    # formatted directly; floats print like csv.writer would (str of the value)
+    prefix = (f"{entry.device_id},{entry.seq},{entry.timestamp_sent},{readable_str},"
+              f"{server_arrival_ms},{int(entry.duplicate)},{int(entry.gap_detected)},{entry.gap_count},"
+              f"{entry.latency:.3f},{entry.jitter:.3f},{entry.msg_type},{entry.payload_len},")
+    suffix = f",{entry.cpu_ms:.6f}{CSV_LINE_END}"
+
+    # --- "Explode" the Batch: one row per (temp, hum, volt) reading ---
+    readings = entry.readings
+    if not readings: # Handle Heartbeats or empty data
+        _PENDING_ROWS.append(f"{prefix}0.0,0.0,0.0{suffix}")
+    else:
+        _PENDING_ROWS.extend([f"{prefix}{round(t, 2)},{round(h, 2)},{round(v, 2)}{suffix}"
+                              for t, h, v in readings])
+    if len(_PENDING_ROWS) >= CSV_FLUSH_EVERY:
+        flush_rows()
+
+def flush_rows():
+    """Hands all pending rows to the CSV writer thread as one batch."""
+    if _PENDING_ROWS:
+        _CSV_QUEUE.put(_PENDING_ROWS[:])
+        _PENDING_ROWS.clear()
+
+def flush_csv():
+    """Hands over pending rows and has the writer thread flush the file to disk."""
+    flush_rows()
+    _CSV_QUEUE.put(_FLUSH_FILE)
+
+def csv_writer_thread(f):
+    """
+    Writes row batches from _CSV_QUEUE with one write() each, off the receive loop,
+    so disk I/O never delays recvmmsg. Runs until it receives None.
+    """
+    while True:
+        item = _CSV_QUEUE.get()
+        if item is None:
+            break
+        if item is _FLUSH_FILE:
+            f.flush()
+        else:
+            f.write(''.join(item))
+    f.flush()
+
+
+def process_and_log_packet(state, packet_data):
     t0 = perf_counter() 
-    seq_num = packet_data['seq']
-    device_id = packet_data['device_id']
+    seq_num = packet_data.seq
+    device_id = packet_data.device_id
     
     state['stats']['received'] += 1
 
@@ -93,11 +362,21 @@ def process_and_log_packet(state, packet_data, filename):
     gap_detected = False
     gap_count = 0
     
-    if seq_num in state['processed_seqs']:
-        packet_data['duplicate'] = True
+    # Duplicate check: O(1) bit test over the 16-bit sequence space
+    seen = state['seen_seqs']
+    byte_idx = seq_num >> 3
+    mask = 1 << (seq_num & 7)
+    if seen[byte_idx] & mask:
+        packet_data.duplicate = True
         state['stats']['duplicates'] += 1
     else:
-        state['processed_seqs'].append(seq_num)
+        # Only the last DUP_WINDOW sequences count as seen; age out the oldest
+        recent = state['processed_seqs']
+        if len(recent) == DUP_WINDOW:
+            old = recent.popleft()
+            seen[old >> 3] &= ~(1 << (old & 7))
+        recent.append(seq_num)
+        seen[byte_idx] |= mask
         if state['last_processed_seq'] is not None:
             last = state['last_processed_seq']
             diff = seq_num - last
@@ -111,24 +390,18 @@ def process_and_log_packet(state, packet_data, filename):
                 gap_count = diff - 1
         state['last_processed_seq'] = seq_num
 
-    packet_data['gap_detected'] = gap_detected
-    packet_data['gap_count'] = gap_count
+    packet_data.gap_detected = gap_detected
+    packet_data.gap_count = gap_count
     if gap_detected:
         state['stats']['gaps'] += gap_count
 
     t1 = perf_counter()
     logic_cost_ms = (t1 - t0) * 1000 
-    packet_data['cpu_ms'] = logic_cost_ms + packet_data.get('parse_cost_ms', 0)
-    
-    # --- "Explode" the Batch: Log each reading ---
-    readings = packet_data.get('readings', [])
+    packet_data.cpu_ms = logic_cost_ms + packet_data.parse_cost_ms
     
-    if not readings: # Handle Heartbeats or empty data
-        log_packet(filename, packet_data, 0.0, 0.0, 0.0)
-    else:
-        for r in readings:
-            # r is a tuple (temp, hum, volt)
-            log_packet(filename, packet_data, r[0], r[1], r[2])
+    log_packet(packet_data)
+    # Rows are built; the entry (and its readings list) can serve the next packet
+    state['entry_pool'].append(packet_data)
 
 
 
@@ -160,182 +433,225 @@ def main():
     parser.add_argument('--output', type=str, default=OUTPUT_CSV, help='CSV output file')
     parser.add_argument('--died_after', type=int, default=LIVENESS_TIMEOUT, help='consider the client dead after timeout (seconds)')
     parser.add_argument('--buffer', type=int, default=DEFAULT_FLUSH_THRESHOLD,help='Reordering buffer flush threshold')
+    parser.add_argument('--quiet', action='store_true', help='Log only warnings (checksum failures, offline devices)')
+    parser.add_argument('--reuseport', action='store_true', help='Let several server processes share the port (SO_REUSEPORT)')
 
     args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(message)s', stream=sys.stdout)
+
     flush_threshold = args.buffer
 
     liveness_timeout_client = args.died_after
 
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_SOCKET_BUFFER)
+    # Opt-in: lets several server processes bind the port and the kernel spreads clients
+    # across them. Off by default so a second server fails with EADDRINUSE instead of
+    # silently taking half the datagrams.
+    if args.reuseport and hasattr(socket, 'SO_REUSEPORT'):
+        try:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        except OSError:
+            pass
     server_socket.bind(('', args.port))
-    server_socket.settimeout(SOCKET_TIMEOUT)
-    initialize_csv(args.output)
+    poller = setup_receive(server_socket)
+    csv_file = initialize_csv(args.output)
+    csv_thread = threading.Thread(target=csv_writer_thread, args=(csv_file,), daemon=True)
+    csv_thread.start()
     
     print(f"[*] Server listening on 0.0.0.0:{args.port} with Reordering Logic")
 
     # State now includes 'stats'
     devices_state = {}
+    arrival_order = itertools.count()  # Tie-breaker for the reorder heaps
+    liveness_heap = []  # (offline deadline, device_id), at most one entry per live device
+
+    # Hot-loop names bound as locals (LOAD_FAST instead of global/attribute lookups)
+    _time = time.time
+    _perf_counter = perf_counter
+    _unpack_header = _HDR_CHK.unpack_from
+    _readings_struct = readings_struct
+    _checksum = compute_checksum
+    _split = split_datagram
+    _heappush = heapq.heappush
+    _heappop = heapq.heappop
+    _process = process_and_log_packet
+    _log_info = log.info
+    _msg_type_name = _MSG_TYPE_NAME.get
+    _log_warning = log.warning
 
     try:
         while True:
 
-            current_real_time = time.time()
+            current_real_time = _time()
             
-            # Liveness Check
-            for d_id, d_state in devices_state.items():
-                if d_state.get('status_alive', True): 
-                    time_since_last = current_real_time - d_state.get('last_seen', current_real_time)
+            # Liveness Check: only devices whose deadline has passed are looked at.
+            # A device heard from since its entry was pushed gets a fresh deadline.
+            while liveness_heap and liveness_heap[0][0] < current_real_time:
+                d_id = _heappop(liveness_heap)[1]
+                d_state = devices_state[d_id]
+                if d_state['status_alive']:
+                    deadline = d_state['last_seen'] + liveness_timeout_client
                     
-                    if time_since_last > liveness_timeout_client:
-                        print(f"[!] ALERT: Device {d_id} is OFFLINE (No signal for {time_since_last:.1f}s)")
+                    if deadline >= current_real_time:
+                        _heappush(liveness_heap, (deadline, d_id))
+                    else:
+                        time_since_last = current_real_time - d_state['last_seen']
+                        log.warning("[!] ALERT: Device %s is OFFLINE (No signal for %.1fs)", d_id, time_since_last)
                         d_state['status_alive'] = False
                                                 # --- NEW: FORCE FLUSH BUFFER FOR DEAD DEVICE ---
                         if len(d_state['buffer']) > 0:
-                            print(f"[*] Flushing {len(d_state['buffer'])} stuck packets for Device {d_id}...")
-                            # 1. Sort what we have
-                            d_state['buffer'].sort(key=lambda x: x['timestamp_sent'])
-                            
-                            # 2. Process all of them
+                            log.info("[*] Flushing %d stuck packets for Device %s...", len(d_state['buffer']), d_id)
+                            # Drain the heap in send-time order
                             while d_state['buffer']:
-                                pkt = d_state['buffer'].pop(0)
-                                pkt['status'] = 'Flushed (Timeout)'
-                                process_and_log_packet(d_state, pkt, args.output)
+                                pkt = _heappop(d_state['buffer'])[2]
+                                pkt.status = 'Flushed (Timeout)'
+                                _process(d_state, pkt)
+                            # Get the dead device's last rows onto disk now
+                            flush_csv()
 
-            # 1. Receive
+            # 1. Receive (a whole batch of datagrams per syscall on Linux)
             try:
-                data, addr = server_socket.recvfrom(1024)
-            except socket.timeout:
-                continue
+                batch = receive_batch(server_socket, poller)
             except Exception as e:
-                print(f"[!] Socket Error: {e}")
+                log.error("[!] Socket Error: %s", e)
                 break
+            if not batch:
+                flush_csv()  # Idle: push buffered rows to disk
+                continue
 
-            arrival_time = time.time()
+            # A datagram may carry several packets (client --concat-datagrams)
+            for datagram, addr, arrival_time in batch:
+                for data in _split(datagram):
 
-            # --- START PARSE TIMER ---
-            t_parse_start = perf_counter()
-            #t_parse_start = process_time()
+                    # --- START PARSE TIMER ---
+                    t_parse_start = _perf_counter()
+                    #t_parse_start = process_time()
                             
-            # 2. Parse
-            if len(data) < HEADER_SIZE + 2: continue
+                    # 2. Parse
+                    if len(data) < HEADER_SIZE + 2: continue
             
-            try:
-                header = data[:HEADER_SIZE]
-                device_id, seq_num, ts_sent, msg_version_byte = struct.unpack(HEADER_FORMAT, header)
+                    try:
+                        header = data[:HEADER_SIZE]  # data is a memoryview: slices are zero-copy
+                        device_id, seq_num, ts_sent, msg_version_byte, checksum = _unpack_header(data, 0)
                 
-                # Extract Version: Shift right by 4 bits to get the top half
-                packet_version = (msg_version_byte >> 4) & 0x0F 
+                        # Extract Version: Shift right by 4 bits to get the top half
+                        packet_version = (msg_version_byte >> 4) & 0x0F 
                 
-                # Extract MsgType: AND with 0x0F (00001111) to get the bottom half
-                msg_type = msg_version_byte & 0x0F
-
-                # Checksum
-                checksum = struct.unpack('!H', data[HEADER_SIZE:HEADER_SIZE+2])[0]
-                if compute_checksum(header + data[HEADER_SIZE+2:]) != checksum:
-                    print(f"[!] Checksum fail from {addr}")
-                    continue
-            except struct.error:
-                continue
-
-            # --- STOP PARSE TIMER ---
-            t_parse_end = perf_counter()
-            #t_parse_end = process_time()
-            parse_cost_ms = (t_parse_end - t_parse_start) * 1000
-
-            # 3. Initialize State
-            if device_id not in devices_state:
-                devices_state[device_id] = {
-                    'buffer': [], 
-                    'last_latency': 0.0,
-                    'last_processed_seq': None,
-                    'processed_seqs': deque(maxlen=500),
-                    'last_seen': arrival_time,
-                    'status_alive': True,
-                    # --- NEW STATS COUNTERS ---
-                    'stats': {'received': 0, 'duplicates': 0, 'gaps': 0}
-                }
+                        # Extract MsgType: AND with 0x0F (00001111) to get the bottom half
+                        msg_type = msg_version_byte & 0x0F
+
+                        # Checksum
+                        # The sum is additive: checksum header and payload separately, no concatenation
+                        body_sum = _checksum(header) + _checksum(data[HEADER_SIZE+2:])
+                        if body_sum & 0xFFFF != checksum:
+                            _log_warning("[!] Checksum fail from %s", addr)
+                            continue
+                    except struct.error:
+                        continue
+
+                    # --- STOP PARSE TIMER ---
+                    t_parse_end = _perf_counter()
+                    #t_parse_end = process_time()
+                    parse_cost_ms = (t_parse_end - t_parse_start) * 1000
+
+                    # 3. Initialize State
+                    if device_id not in devices_state:
+                        _heappush(liveness_heap, (arrival_time + liveness_timeout_client, device_id))
+                        devices_state[device_id] = {
+                            'buffer': [], 
+                            'last_latency': 0.0,
+                            'last_processed_seq': None,
+                            'processed_seqs': deque(),
+                            'entry_pool': deque(maxlen=ENTRY_POOL_SIZE),  # Recycled PacketEntry objects
+                            'seen_seqs': bytearray(SEQ_MAX // 8),  # Bitset of processed_seqs
+                            'last_seen': arrival_time,
+                            'status_alive': True,
+                            # --- NEW STATS COUNTERS ---
+                            'stats': {'received': 0, 'duplicates': 0, 'gaps': 0}
+                        }
             
-            state = devices_state[device_id]
-            state['last_seen'] = arrival_time
+                    state = devices_state[device_id]
+                    state['last_seen'] = arrival_time
 
-            if state['status_alive'] == False:
-                 print(f"[*] ALERT: Device {device_id} is BACK ONLINE!")
-            state['status_alive'] = True
+                    if state['status_alive'] == False:
+                         _log_info("[*] ALERT: Device %s is BACK ONLINE!", device_id)
+                         _heappush(liveness_heap, (arrival_time + liveness_timeout_client, device_id))
+                    state['status_alive'] = True
 
             
-            if msg_type == MSG_INIT:
-                print(f"[*] RESET: Received INIT from Device {device_id}. Clearing sequence history.")
-                state['processed_seqs'].clear()
-                state['last_processed_seq'] = None
-                state['stats']['duplicates'] = 0 # Optional: reset stats for the new session
+                    if msg_type == MSG_INIT:
+                        _log_info("[*] RESET: Received INIT from Device %s. Clearing sequence history.", device_id)
+                        state['processed_seqs'].clear()
+                        state['seen_seqs'][:] = bytes(SEQ_MAX // 8)
+                        state['last_processed_seq'] = None
+                        state['stats']['duplicates'] = 0 # Optional: reset stats for the new session
             
 
             
 
-            # --- PAYLOAD PARSING ---
-            payload = data[HEADER_SIZE+2:]
-            readings_list = []
-            if msg_type == MSG_DATA and len(payload) > 0:
-                try:
-                    count = struct.unpack('!B', payload[:1])[0]
-                    for i in range(count):
-                        start_idx = 1 + (i * 12)
-                        end_idx = start_idx + 12
-                        if len(payload) >= end_idx:
-                            chunk = payload[start_idx:end_idx]
-                            t_val, h_val, v_val = struct.unpack('!fff', chunk)
-                            readings_list.append((t_val, h_val, v_val))
-                except struct.error:
-                    print(f"[!] Payload parse error from {device_id}")
-
-            # 4. Pre-Calculation
-            relative_arrival = arrival_time - TIMESTAMP_OFFSET
-            arrival_ms_masked = int(relative_arrival * 1000) & 0xFFFFFFFF
-            latency_ms = arrival_ms_masked - ts_sent
-            if latency_ms < -2147483648: latency_ms += 4294967296
-            latency_ms = max(0, latency_ms)
-
-            jitter = 0.0
-            if state['last_latency'] > 0:
-                jitter = abs(latency_ms - state['last_latency'])
-            state['last_latency'] = latency_ms
-
-            # 5. Add to Buffer
-            packet_entry = {
-                'device_id': device_id,
-                'seq': seq_num,
-                'timestamp_sent': ts_sent,      
-                'arrival_time': arrival_time,
-                'latency': latency_ms,
-                'jitter': jitter,
-                'duplicate': False,            
-                'gap_detected': False,          
-                'gap_count': 0,
-                'msg_type': 'INIT' if msg_type == MSG_INIT else ('DATA' if msg_type == MSG_DATA else 'HEARTBEAT'),
-                'payload_len': len(data) - HEADER_SIZE - 2,
-                'readings': readings_list,
-                'status': 'Buffered',
-                'parse_cost_ms': parse_cost_ms
-            }
-            
-            state['buffer'].append(packet_entry)
+                    # --- PAYLOAD PARSING ---
+                    payload = data[HEADER_SIZE+2:]
+                    entry_pool = state['entry_pool']
+                    packet_entry = entry_pool.pop() if entry_pool else PacketEntry()
+                    readings_list = packet_entry.readings
+                    readings_list.clear()
+                    if msg_type == MSG_DATA and len(payload) > 0:
+                        try:
+                            count = payload[0]
+                            # Unpack every complete reading with one cached Struct
+                            if packet_version >= 2:
+                                # int16 fixed-point readings (6 Bytes each)
+                                count = min(count, (len(payload) - 1) // _READING_V2.size)
+                                vals = _readings_struct('hhh', count).unpack_from(payload, 1)
+                                readings_list.extend((t_raw / TEMP_SCALE, h_raw / HUM_SCALE, v_raw / VOLT_SCALE)
+                                                     for t_raw, h_raw, v_raw in zip(vals[0::3], vals[1::3], vals[2::3]))
+                            else:
+                                count = min(count, (len(payload) - 1) // _READING_V1.size)
+                                vals = _readings_struct('fff', count).unpack_from(payload, 1)
+                                readings_list.extend(zip(vals[0::3], vals[1::3], vals[2::3]))
+                        except struct.error:
+                            _log_warning("[!] Payload parse error from %s", device_id)
+
+                    # 4. Pre-Calculation
+                    relative_arrival = arrival_time - TIMESTAMP_OFFSET
+                    arrival_ms_masked = int(relative_arrival * 1000) & 0xFFFFFFFF
+                    latency_ms = arrival_ms_masked - ts_sent
+                    if latency_ms < -2147483648: latency_ms += 4294967296
+                    latency_ms = max(0, latency_ms)
+
+                    jitter = 0.0
+                    if state['last_latency'] > 0:
+                        jitter = abs(latency_ms - state['last_latency'])
+                    state['last_latency'] = latency_ms
+
+                    # 5. Add to Buffer
+                    packet_entry.reset(
+                        device_id, seq_num, ts_sent, arrival_time, latency_ms, jitter,
+                        _msg_type_name(msg_type, 'HEARTBEAT'),
+                        len(data) - HEADER_SIZE - 2,
+                        parse_cost_ms,
+                    )
             
-            # 6. Reordering Logic
-            state['buffer'].sort(key=lambda x: x['timestamp_sent'])
+                    # 6. Reordering Logic: min-heap on send time; the arrival
+                    # counter breaks ties in arrival order, like a stable sort
+                    _heappush(state['buffer'], (ts_sent, next(arrival_order), packet_entry))
             
-            while len(state['buffer']) > flush_threshold:
-                packet_to_process = state['buffer'].pop(0)
-                process_and_log_packet(state, packet_to_process, args.output)
+                    while len(state['buffer']) > flush_threshold:
+                        packet_to_process = _heappop(state['buffer'])[2]
+                        _process(state, packet_to_process)
 
     except KeyboardInterrupt:
         print("\n[*] Interrupt received...")
     finally:
         print("[*] Flushing remaining buffers...")
         for dev_id, state in devices_state.items():
-            state['buffer'].sort(key=lambda x: x['timestamp_sent'])
-            for pkt in state['buffer']:
-                pkt['status'] = 'Flushed'
-                process_and_log_packet(state, pkt, args.output)
+            while state['buffer']:
+                pkt = heapq.heappop(state['buffer'])[2]
+                pkt.status = 'Flushed'
+                process_and_log_packet(state, pkt)
         
         # --- PRINT SUMMARY REPORT ---
         print("\n" + "="*40)
@@ -358,6 +674,10 @@ def main():
             print("-" * 20)
         
         print("[*] Server stopped.")
+        flush_rows()
+        _CSV_QUEUE.put(None)  # Writer thread drains the queue, then exits
+        csv_thread.join()
+        csv_file.close()
         server_socket.close()
 
 if __name__ == "__main__":
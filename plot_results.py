@@ -1,148 +1,225 @@
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Files only: skip probing for an interactive (Qt/Tk) backend
 import matplotlib.pyplot as plt
 import os
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without pyarrow the plots parse the CSVs directly
+    pa = pa_csv = pq = None
 
 OUTPUT_DIR = "Output"
 GRAPHS_DIR = "Graphs"
+# Set PUB_QUALITY=1 to also write a vector (SVG) copy of the summary for publication
+PUB_QUALITY = os.environ.get('PUB_QUALITY', '').strip().lower() in ('1', 'true', 'yes', 'on')
 HEADER_SIZE = 11  # 9B Header + 2B Checksum
+# The only columns the plots read, with narrow dtypes
+COLUMN_DTYPES = {'payload_size': 'int32', 'gap_count': 'int32',
+                 'cpu_ms': 'float32', 'latency_ms': 'float32'}
+
+# (label, test folder) pairs shown by each plot
+OVERHEAD_SCENARIOS = [("1s", "baseline_1s"), ("5s", "baseline_5s"), 
+                      ("10s", "baseline_10s"), ("20s", "baseline_20s"), ("30s", "baseline_30s")]
+ROBUSTNESS_SCENARIOS = [(0, "baseline_1s"), (5, "loss_5_percent"),
+                        (10, "loss_10_percent"), (20, "loss_20_percent"), (30, "loss_30_percent")]
+CPU_SCENARIOS = [("Very High (0.5s)", "baseline_0.5s"), ("High (1s)", "baseline_1s"),
+                 ("Medium (10s)", "baseline_10s"), ("Low (30s)", "baseline_30s")]
+JITTER_SCENARIOS = [("Stable (Baseline)", "baseline_1s"), ("Unstable (Jitter)", "jitter_test")]
 
 if not os.path.exists(GRAPHS_DIR):
     os.makedirs(GRAPHS_DIR)
 
+def csv_schema():
+    """Column types of the server log, so pyarrow skips type inference."""
+    return {
+        'device_id': pa.int32(), 'seq': pa.int32(), 'timestamp_raw': pa.int64(),
+        'readable_time': pa.string(), 'arrival_time': pa.int64(),
+        'duplicate_flag': pa.int8(), 'gap_flag': pa.int8(), 'gap_count': pa.int32(),
+        'latency_ms': pa.float64(), 'jitter_ms': pa.float64(), 'msg_type': pa.string(),
+        'payload_size': pa.int32(), 'temp': pa.float64(), 'humidity': pa.float64(),
+        'voltage': pa.float64(), 'cpu_ms': pa.float64(),
+    }
+
+def csv_to_parquet(csv_path):
+    """
+    Converts a test CSV to a zstd-compressed Parquet file next to it and returns
+    its path. The conversion runs once; later runs reuse the Parquet file
+    until the CSV is newer.
+    """
+    parquet_path = os.path.splitext(csv_path)[0] + '.parquet'
+    if not os.path.exists(parquet_path) or os.path.getmtime(parquet_path) < os.path.getmtime(csv_path):
+        # Memory-mapped input: the parser reads straight from the page cache
+        with pa.memory_map(csv_path, 'r') as source:
+            table = pa_csv.read_csv(source, convert_options=pa_csv.ConvertOptions(column_types=csv_schema()))
+        pq.write_table(table, parquet_path, compression='zstd')
+    return parquet_path
+
+@lru_cache(maxsize=None)
 def load_csv(test_name):
+    """
+    Loads the plotted columns (COLUMN_DTYPES) of a test's log; the others are
+    never materialized. Cached, so a test shared by several plots is read once
+    per run; callers must not modify the returned frame.
+    With pyarrow installed the log is read from its columnar Parquet copy,
+    otherwise the CSV is parsed directly.
+    """
     path = os.path.join(OUTPUT_DIR, test_name, f"{test_name}.csv")
     if not os.path.exists(path):
         print(f"[!] Missing: {path}")
         return None
-    return pd.read_csv(path)
+    columns = list(COLUMN_DTYPES)
+    if pq is not None:
+        return pd.read_parquet(csv_to_parquet(path), columns=columns, engine='pyarrow').astype(COLUMN_DTYPES)
+    return pd.read_csv(path, usecols=columns, engine='c', dtype=COLUMN_DTYPES)
+
+def preload_csvs():
+    """
+    Parses every test log the plots use in parallel threads (the CSV and
+    Parquet readers release the GIL), filling the load_csv cache. The plots
+    themselves then draw serially from memory, since matplotlib is not thread-safe.
+    """
+    folders = sorted({folder for scenarios in (OVERHEAD_SCENARIOS, ROBUSTNESS_SCENARIOS,
+                                               CPU_SCENARIOS, JITTER_SCENARIOS)
+                      for _, folder in scenarios})
+    with ThreadPoolExecutor(max_workers=min(len(folders), os.cpu_count() or 1)) as pool:
+        list(pool.map(load_csv, folders))
 
 # ==========================================
 # PLOT A: Bytes vs Interval
 # ==========================================
-def plot_a_overhead():
+def plot_a_overhead(ax):
     print("[*] Generating Plot A: Overhead...")
-    scenarios = [("1s", "baseline_1s"), ("5s", "baseline_5s"), 
-                 ("10s", "baseline_10s"), ("20s", "baseline_20s"), ("30s", "baseline_30s")]
-    
     x, y = [], []
-    for lbl, folder in scenarios:
+    for lbl, folder in OVERHEAD_SCENARIOS:
         df = load_csv(folder)
         if df is not None:
             x.append(lbl)
             y.append(df['payload_size'].mean() + HEADER_SIZE)
 
-    if not x: return
+    if not x:
+        ax.set_visible(False)
+        return
 
-    plt.figure(figsize=(8, 5))
-    bars = plt.bar(x, y, color='#2ecc71', edgecolor='black', alpha=0.8)
-    plt.title('Protocol Overhead: Avg Bytes per Report vs Interval')
-    plt.xlabel('Reporting Interval')
-    plt.ylabel('Avg Packet Size (Bytes)')
-    plt.ylim(0, 35)
-    plt.grid(axis='y', linestyle='--', alpha=0.5)
+    bars = ax.bar(x, y, color='#2ecc71', edgecolor='black', alpha=0.8)
+    ax.set_title('Protocol Overhead: Avg Bytes per Report vs Interval')
+    ax.set_xlabel('Reporting Interval')
+    ax.set_ylabel('Avg Packet Size (Bytes)')
+    ax.set_ylim(0, 35)
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
     
     for bar in bars:
-        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5, 
-                 f"{bar.get_height():.1f} B", ha='center', fontweight='bold')
-    
-    plt.savefig(f"{GRAPHS_DIR}/plot_a_overhead.png", dpi=300)
-    plt.close()
+        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5, 
+                f"{bar.get_height():.1f} B", ha='center', fontweight='bold')
 
 # ==========================================
 # PLOT B: Gap Detection vs Loss
 # ==========================================
-def plot_b_robustness():
+def plot_b_robustness(ax):
     print("[*] Generating Plot B: Robustness (Gaps)...")
-    scenarios = [(0, "baseline_1s"), (5, "loss_5_percent"),
-                 (10, "loss_10_percent"), (20, "loss_20_percent"), (30, "loss_30_percent")]
-    
     x, y = [], []
-    for loss, folder in scenarios:
+    for loss, folder in ROBUSTNESS_SCENARIOS:
         df = load_csv(folder)
         if df is not None:
             x.append(loss)
             y.append(df['gap_count'].sum())
 
-    if not x: return
+    if not x:
+        ax.set_visible(False)
+        return
 
-    plt.figure(figsize=(8, 5))
-    plt.plot(x, y, marker='o', color='#e74c3c', linewidth=2, markersize=8)
-    plt.title('Robustness: Gap Detection vs Packet Loss')
-    plt.xlabel('Simulated Loss (%)')
-    plt.ylabel('Total Gaps Detected')
-    plt.grid(True, linestyle='--', alpha=0.5)
-    plt.xticks([0, 5, 10, 15, 20, 25, 30])
+    ax.plot(x, y, marker='o', color='#e74c3c', linewidth=2, markersize=8)
+    ax.set_title('Robustness: Gap Detection vs Packet Loss')
+    ax.set_xlabel('Simulated Loss (%)')
+    ax.set_ylabel('Total Gaps Detected')
+    ax.grid(True, linestyle='--', alpha=0.5)
+    ax.set_xticks([0, 5, 10, 15, 20, 25, 30])
     
     for i, txt in enumerate(y):
-        plt.annotate(f"{txt}", (x[i], y[i]), xytext=(0, 10), textcoords='offset points', ha='center')
-
-    plt.savefig(f"{GRAPHS_DIR}/plot_b_robustness.png", dpi=300)
-    plt.close()
+        ax.annotate(f"{txt}", (x[i], y[i]), xytext=(0, 10), textcoords='offset points', ha='center')
 
 # ==========================================
 # PLOT C: CPU Cost
 # ==========================================
-def plot_c_cpu():
+def plot_c_cpu(ax):
     print("[*] Generating Plot C: CPU Cost...")
-    scenarios = [("Very High (0.5s)", "baseline_0.5s"), ("High (1s)", "baseline_1s"),
-                 ("Medium (10s)", "baseline_10s"), ("Low (30s)", "baseline_30s")]
-    
     x, y = [], []
-    for lbl, folder in scenarios:
+    for lbl, folder in CPU_SCENARIOS:
         df = load_csv(folder)
         if df is not None:
             x.append(lbl)
             y.append(df['cpu_ms'].mean() * 1000) # Convert to microseconds
 
-    if not x: return
+    if not x:
+        ax.set_visible(False)
+        return
 
-    plt.figure(figsize=(8, 5))
-    bars = plt.bar(x, y, color='#9b59b6', edgecolor='black', width=0.5, alpha=0.8)
-    plt.title('Server Performance: CPU Cost per Packet')
-    plt.ylabel('Processing Time (microseconds)')
-    plt.grid(axis='y', linestyle='--', alpha=0.5)
+    bars = ax.bar(x, y, color='#9b59b6', edgecolor='black', width=0.5, alpha=0.8)
+    ax.set_title('Server Performance: CPU Cost per Packet')
+    ax.set_ylabel('Processing Time (microseconds)')
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
     
     for bar in bars:
-        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1, 
-                 f"{bar.get_height():.1f} µs", ha='center', fontweight='bold')
-
-    plt.savefig(f"{GRAPHS_DIR}/plot_c_cpu.png", dpi=300)
-    plt.close()
+        # Offset in points, not data units: keeps the label just above short bars
+        ax.annotate(f"{bar.get_height():.1f} µs", (bar.get_x() + bar.get_width()/2, bar.get_height()),
+                    xytext=(0, 3), textcoords='offset points', ha='center', fontweight='bold')
 
 # ==========================================
 # PLOT D: Latency Distribution (Jitter)
 # ==========================================
-def plot_d_jitter():
+def box_stats(values, label):
+    """
+    Quartiles and 1.5*IQR whiskers of one sample, in the form Axes.bxp draws.
+    Outliers are left out, so matplotlib neither recomputes the statistics
+    nor draws one marker per outlying packet.
+    """
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    # Whiskers end at the most extreme samples still inside the 1.5*IQR fences
+    whislo = values[values >= q1 - 1.5 * iqr].min()
+    whishi = values[values <= q3 + 1.5 * iqr].max()
+    return {'label': label, 'med': med, 'q1': q1, 'q3': q3,
+            'whislo': whislo, 'whishi': whishi, 'fliers': []}
+
+def plot_d_jitter(ax):
     print("[*] Generating Plot D: Latency Distribution...")
-    scenarios = [("Stable (Baseline)", "baseline_1s"), ("Unstable (Jitter)", "jitter_test")]
+    stats = []
     
-    data = []
-    labels = []
-    
-    for lbl, folder in scenarios:
+    for lbl, folder in JITTER_SCENARIOS:
         df = load_csv(folder)
-        if df is not None:
-            data.append(df['latency_ms'])
-            labels.append(lbl)
-
-    if not data: return
-
-    plt.figure(figsize=(6, 5))
-    plt.boxplot(data, labels=labels, patch_artist=True, 
-                boxprops=dict(facecolor='#3498db', color='black'),
-                medianprops=dict(color='red'))
-    plt.title('Jitter Analysis: End-to-End Latency Distribution')
-    plt.ylabel('Latency (ms)')
-    plt.grid(axis='y', linestyle='--', alpha=0.5)
-
-    plt.savefig(f"{GRAPHS_DIR}/plot_d_jitter.png", dpi=300)
-    plt.close()
+        # A header-only log (server ran, no packet arrived) has no box to draw
+        if df is not None and not df.empty:
+            stats.append(box_stats(df['latency_ms'].to_numpy(), lbl))
+
+    if not stats:
+        ax.set_visible(False)
+        return
+
+    ax.bxp(stats, patch_artist=True, showfliers=False,
+           boxprops=dict(facecolor='#3498db', edgecolor='black'),
+           medianprops=dict(color='red'))
+    ax.set_title('Jitter Analysis: End-to-End Latency Distribution')
+    ax.set_ylabel('Latency (ms)')
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
 # ==========================================
 
 
 if __name__ == "__main__":
-    plot_a_overhead()
-    plot_b_robustness()
-    plot_c_cpu()
-    plot_d_jitter()
-    print("[*] Done! Check the 'Graphs' folder.")
\ No newline at end of file
+    preload_csvs()
+    # All four plots share one figure: a single layout pass and a single PNG encode
+    fig, ((ax_a, ax_b), (ax_c, ax_d)) = plt.subplots(2, 2, figsize=(16, 10))
+    plot_a_overhead(ax_a)
+    plot_b_robustness(ax_b)
+    plot_c_cpu(ax_c)
+    plot_d_jitter(ax_d)
+    fig.tight_layout()
+    fig.savefig(f"{GRAPHS_DIR}/summary.png", dpi=150)
+    if PUB_QUALITY:
+        fig.savefig(f"{GRAPHS_DIR}/summary.svg")
+    plt.close(fig)
+    print(f"[*] Done! Check '{GRAPHS_DIR}/summary.png'.")
\ No newline at end of file